@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import atexit
 import os
 import tempfile
 import threading
@@ -7,7 +8,14 @@ from src.services.session_manager import SessionManager
 from src.services.email_verifier import EmailVerifier
 
 ev_session = SessionManager()
-ev = EmailVerifier()
+
+@st.cache_resource(show_spinner=False)
+def get_email_verifier() -> EmailVerifier:
+    # One verifier for the app's lifetime, so its MX cache and SMTP pool survive reruns
+    verifier = EmailVerifier(mx_cache_path=".mx_cache.db")
+    # Flush SMTP sessions and the MX cache file when the server shuts down
+    atexit.register(verifier.close)
+    return verifier
 
 st.set_page_config(
     page_title="Email Verifier",
@@ -15,20 +23,62 @@ st.set_page_config(
     layout="wide",
 )
 
+ev = get_email_verifier()
+
+def remove_results_file(path):
+    """Delete a results CSV this session no longer points at."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError as e:
+        print(f"Could not remove results file {path}: {e}")
+
 def email_verifier():
     input = ev_session.get("ev_upload_csv_filepath")
-    output = ev_session.get("ev_output_csv_filepath")
+    # The preview in main() already read the upload; rewind and parse it in memory
+    input.seek(0)
+    
+    output_dir = ev_session.get("ev_output_csv_filepath") or tempfile.gettempdir()
+    # A fresh file per run: the verifier is shared across sessions, so a fixed
+    # name would let concurrent runs truncate and interleave each other's output
+    fd, output = tempfile.mkstemp(prefix="validated_emails_", suffix=".csv", dir=output_dir)
+    os.close(fd)
+    
+    # Kept in session so the Cancel button can stop this run from a later rerun
+    cancel_event = threading.Event()
+    ev_session.set("ev_cancel_event", cancel_event)
+    progress_bar = st.progress(0.0, text="Validating emails...")
     
-    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-        tmp_file.write(input.getvalue())
-        tmp_path = tmp_file.name
+    def update_progress(done, total):
+        progress_bar.progress(done / total if total else 1.0, text=f"Validated {done}/{total} emails")
         
     try:
-        df_results, summary = ev.process_emails_in_bulk(input_path=tmp_path, output_path=output)
-        return df_results, summary
+        df_results, summary = ev.process_emails_in_bulk(
+            input_path=input,
+            output_path=output,
+            progress_cb=update_progress,
+            cancel_event=cancel_event,
+        )
     except Exception as e:
         print(f"Error Verifying Emails in Bulk: {e}")
+        remove_results_file(output)
         return None, None
+    except BaseException:
+        # Interrupted by a rerun (e.g. Cancel clicked): drop the partial file and leave
+        # the previous run's preview, summary and download untouched
+        remove_results_file(output)
+        raise
+    
+    if cancel_event.is_set():
+        # Same for a run that stopped early without being interrupted
+        remove_results_file(output)
+        st.warning("Validation cancelled; showing the previous results.")
+        return ev_session.get("df_results"), ev_session.get("summary")
+    
+    remove_results_file(ev_session.get("ev_results_csv_filepath"))
+    ev_session.set("ev_results_csv_filepath", output)
+    return df_results, summary
     
     
 def main():
@@ -41,14 +91,19 @@ def main():
         df_input = pd.read_csv(upload_csv_filepaths)
         st.write(df_input)
     
-    if st.button("Start Bulk Validation"):
+    col_start, col_cancel = st.columns([0.2, 0.8])
+    with col_start:
+        start_clicked = st.button("Start Bulk Validation")
+    with col_cancel:
+        if st.button("Cancel Validation"):
+            cancel_event = ev_session.get("ev_cancel_event")
+            if cancel_event is not None:
+                cancel_event.set()
+    
+    if start_clicked:
         try:
             if not upload_csv_filepaths:
                 st.error("No CSV file uploaded yet...")
-        
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
-                tmp.write(upload_csv_filepaths.getvalue())
-                tmp_path = tmp.name
             
             with st.spinner("Processing..."):
                 df_results, summary = email_verifier()
@@ -72,14 +127,19 @@ def main():
             st.write(summary)
             
         with col2:
-            csv_data = df_results.to_csv(index=False).encode('utf-8')
-            
-            st.download_button(
-                label="Download Full Results as CSV",
-                data=csv_data,
-                file_name="validated_emails.csv",
-                mime="text/csv"
-            )
+            # Serve the CSV the verifier streamed to disk rather than re-encoding the preview
+            results_path = ev_session.get("ev_results_csv_filepath")
+            try:
+                with open(results_path, "rb") as results_file:
+                    st.download_button(
+                        label="Download Full Results as CSV",
+                        data=results_file,
+                        file_name="validated_emails.csv",
+                        mime="text/csv"
+                    )
+            except (OSError, TypeError) as e:
+                print(f"Results file unavailable: {e}")
+                st.warning("Results file is no longer available; run the validation again.")
     
 if __name__ == "__main__":
     main()
\ No newline at end of file
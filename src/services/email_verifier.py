@@ -1,18 +1,62 @@
 from dataclasses import dataclass
-from typing import Optional, List, Tuple, Dict
+from typing import Optional, List, Tuple, Dict, Deque, Iterator, Union, IO, Callable
 import dns.exception
 import dns.resolver
-import re
-from email.utils import parseaddr
+try:
+    # google-re2 matches with a linear-time DFA; fall back to the stdlib engine if absent
+    import re2 as regex_engine
+except ImportError:
+    import re as regex_engine
 import smtplib
 import socket
+import threading
+import time
 import csv
+import queue
+import secrets
+import sqlite3
+import json
+from collections import defaultdict, deque
 import pandas as pd
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-EMAIL_REGEX = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Every character stdlib re treats as \s, spelled out so RE2 (ASCII-only \s) and the
+# pandas path (stdlib re) reject exactly the same addresses
+_WHITESPACE = "\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
 
-@dataclass
+# Matching and domain extraction in one pass: EMAIL_REGEX.match(email).group("domain")
+EMAIL_REGEX = regex_engine.compile(
+    f"^(?P<local>[^@{_WHITESPACE}]+)@(?P<domain>[^@{_WHITESPACE}]+\\.[^@{_WHITESPACE}]+)$"
+)
+
+# Upper bound for positive MX cache entries, and TTL for definitive negative (no MX) entries
+MX_CACHE_MAX_TTL = 3600
+MX_CACHE_NEGATIVE_TTL = 60
+
+# Idle SMTP sessions kept per MX host, and probes sent before a session is recycled
+SMTP_POOL_SIZE = 4
+SMTP_MAX_PROBES_PER_CONNECTION = 100
+# Concurrent SMTP sessions allowed per MX host (and bulk tasks per host), so runs don't flood one server
+SMTP_MAX_SESSIONS_PER_HOST = 4
+# TCP connect timeout for new SMTP sessions, and how long an unreachable MX host is skipped
+SMTP_CONNECT_TIMEOUT = 2
+SMTP_DEAD_HOST_TTL = 300
+# Seconds a catch-all probe result is reused, and the shorter reuse for inconclusive probes
+CATCHALL_CACHE_TTL = 3600
+CATCHALL_INCONCLUSIVE_TTL = 300
+
+# Worker threads for the up-front MX resolution phase of bulk runs
+DNS_MAX_WORKERS = 256
+
+# Rows read per chunk when loading large input CSVs
+CSV_CHUNK_SIZE = 100_000
+# Result rows written between flushes of the output CSV, and rows kept for the UI preview
+CSV_FLUSH_EVERY = 1000
+PREVIEW_ROWS = 1000
+# Longest gap, in seconds, between progress callbacks during a bulk run
+PROGRESS_INTERVAL = 0.5
+
+@dataclass(slots=True)
 class ValidationResult:
     email: str
     syntax_valid: bool
@@ -23,83 +67,347 @@ class ValidationResult:
     smtp_message: str
     overall_status: str
 
+FIELDNAMES = [
+    "email",
+    "syntax_valid",
+    "has_mx_record",
+    "smtp_checked",
+    "smtp_status",
+    "smtp_code",
+    "smtp_message",
+    "overall_status",
+]
+
+# One output row in FIELDNAMES order; the bulk path passes these instead of ValidationResult objects
+ResultRow = Tuple[str, bool, bool, bool, str, Optional[int], str, str]
+
+# A bulk work item: cleaned email, its domain, and that domain's MX hosts from the resolution phase
+BulkItem = Tuple[str, str, List[str]]
+
+def _result_row(r: ValidationResult) -> ResultRow:
+    return (
+        r.email,
+        r.syntax_valid,
+        r.has_mx_record,
+        r.smtp_checked,
+        r.smtp_status,
+        r.smtp_code,
+        r.smtp_message,
+        r.overall_status,
+    )
+
+class _ProbeSMTP(smtplib.SMTP):
+    """SMTP client that gives up on unreachable hosts after a short connect timeout."""
+
+    def _get_socket(self, host, port, timeout):
+        sock = socket.create_connection((host, port), min(timeout, SMTP_CONNECT_TIMEOUT), self.source_address)
+        # Once connected, slow servers still get the full timeout for banner and replies
+        sock.settimeout(timeout)
+        return sock
+
+def _split_evenly(items: List, parts: int) -> List[List]:
+    """Split items into at most `parts` contiguous, non-empty chunks of near-equal size."""
+    size = max(1, -(-len(items) // parts))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class _ProgressCounter:
+    """Thread-safe count of emails validated so far in a bulk run."""
+
+    def __init__(self, initial: int = 0):
+        self._value = initial
+        self._lock = threading.Lock()
+
+    def add(self, n: int = 1) -> None:
+        with self._lock:
+            self._value += n
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            return self._value
+
 class EmailVerifier:
-    def __init__(self):
-        pass
-    
-    def _is_valid_syntax(self, email: str) -> bool:
-        name, addr = parseaddr(email)
-        if not addr or "@" not in addr:
-            return False
-        if not EMAIL_REGEX.match(addr):
-            return False
-        return True
+    def __init__(self, mx_cache_path: Optional[str] = None):
+        # domain -> (expiry as wall-clock time, mx hosts)
+        self._mx_cache: Dict[str, Tuple[float, List[str]]] = {}
+        self._mx_lock = threading.Lock()
+        # Optional on-disk copy of the MX cache so lookups survive app restarts
+        self._mx_store: Optional[sqlite3.Connection] = self._open_mx_store(mx_cache_path) if mx_cache_path else None
+        # Parse resolv.conf once; per-call timeouts are passed as lifetime
+        self._resolver = dns.resolver.Resolver(configure=True)
+        # mx host -> idle SMTP sessions, reused across RCPT probes
+        self._smtp_pool: Dict[str, queue.LifoQueue] = defaultdict(lambda: queue.LifoQueue(maxsize=SMTP_POOL_SIZE))
+        self._smtp_probes: Dict[smtplib.SMTP, int] = {}
+        self._smtp_slots: Dict[str, threading.BoundedSemaphore] = defaultdict(
+            lambda: threading.BoundedSemaphore(SMTP_MAX_SESSIONS_PER_HOST)
+        )
+        # mx host -> monotonic time its last TCP connect failed
+        self._dead_mx: Dict[str, float] = {}
+        self._pool_lock = threading.Lock()
+        # domain -> (monotonic expiry, whether its MX accepts any recipient)
+        self._catchall_cache: Dict[str, Tuple[float, bool]] = {}
+        self._catchall_lock = threading.Lock()
+        # Domains with a probe in progress; other threads wait on the event instead of probing too
+        self._catchall_inflight: Dict[str, threading.Event] = {}
     
+    def _open_mx_store(self, path: str) -> Optional[sqlite3.Connection]:
+        store = None
+        try:
+            # Used from the DNS pool and from Streamlit script threads, never concurrently:
+            # every access holds _mx_lock. Autocommit, so entries persist without a close.
+            store = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            store.execute("PRAGMA journal_mode=WAL")
+            store.execute("PRAGMA synchronous=NORMAL")
+            store.execute(
+                "CREATE TABLE IF NOT EXISTS mx_cache (domain TEXT PRIMARY KEY, expiry REAL NOT NULL, hosts TEXT NOT NULL)"
+            )
+            # Drop expired entries so the file doesn't grow without bound
+            store.execute("DELETE FROM mx_cache WHERE expiry <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"MX cache at {path} unavailable, using memory only: {e}")
+            if store is not None:
+                store.close()
+            return None
+        return store
+
+    def _cache_mx_records(self, domain: str, expiry: float, records: List[str]) -> None:
+        with self._mx_lock:
+            self._mx_cache[domain] = (expiry, records)
+            if self._mx_store is not None:
+                try:
+                    self._mx_store.execute(
+                        "INSERT OR REPLACE INTO mx_cache (domain, expiry, hosts) VALUES (?, ?, ?)",
+                        (domain, expiry, json.dumps(records)),
+                    )
+                except sqlite3.Error as e:
+                    print(f"Could not persist MX records for {domain}: {e}")
+
+    def _load_persisted_mx_records(self, domain: str) -> Optional[Tuple[float, List[str]]]:
+        # Caller holds _mx_lock
+        try:
+            row = self._mx_store.execute("SELECT expiry, hosts FROM mx_cache WHERE domain = ?", (domain,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Could not read persisted MX records for {domain}: {e}")
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def close(self) -> None:
+        """Close pooled SMTP sessions and the on-disk MX cache."""
+        self.close_smtp_connections()
+        with self._mx_lock:
+            if self._mx_store is not None:
+                self._mx_store.close()
+                self._mx_store = None
+
+    def _prune_expired_caches(self) -> None:
+        """Drop expired MX, catch-all and dead-host entries; the verifier lives as long as the app."""
+        now, mono = time.time(), time.monotonic()
+        with self._mx_lock:
+            for domain in [d for d, (expiry, _) in self._mx_cache.items() if expiry <= now]:
+                del self._mx_cache[domain]
+            if self._mx_store is not None:
+                try:
+                    self._mx_store.execute("DELETE FROM mx_cache WHERE expiry <= ?", (now,))
+                except sqlite3.Error as e:
+                    print(f"Could not prune persisted MX records: {e}")
+        with self._catchall_lock:
+            for domain in [d for d, (expiry, _) in self._catchall_cache.items() if expiry <= mono]:
+                del self._catchall_cache[domain]
+        with self._pool_lock:
+            for mx in [m for m, failed_at in self._dead_mx.items() if mono - failed_at >= SMTP_DEAD_HOST_TTL]:
+                del self._dead_mx[mx]
+
     def _lookup_mx_records(self, domain: str, timeout: int) -> List[str]:
-        resolver = dns.resolver.Resolver()
-        resolver.lifetime = timeout
-        resolver.timeout = timeout
+        # Wall-clock rather than monotonic time, since expiries are persisted to disk
+        now = time.time()
+        with self._mx_lock:
+            cached = self._mx_cache.get(domain)
+            if cached is None and self._mx_store is not None:
+                cached = self._load_persisted_mx_records(domain)
+                if cached is not None:
+                    self._mx_cache[domain] = cached
+        if cached is not None and cached[0] > now:
+            return cached[1]
 
         try:
-            answers = resolver.resolve(domain, "MX")
-        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.exception.Timeout, dns.resolver.NoNameservers, dns.resolver.YXDOMAIN):
+            answers = self._resolver.resolve(domain, "MX", lifetime=timeout)
+        except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN, dns.resolver.YXDOMAIN):
+            # Definitive "no MX" answers are cached briefly
+            self._cache_mx_records(domain, now + MX_CACHE_NEGATIVE_TTL, [])
             return []
-        records = []
-        for rdata in answers:
+        except (dns.exception.Timeout, dns.resolver.NoNameservers):
+            # Transient (timeout, SERVFAIL): don't cache, so the next address retries
+            return []
+        # RFC 5321: try the lowest preference value first
+        preferred = sorted(
             # rdata.exchange is a dns.name.Name
-            records.append(str(rdata.exchange).rstrip("."))
+            (int(rdata.preference), str(rdata.exchange).rstrip("."))
+            for rdata in answers
+        )
+        records = [host for _, host in preferred]
+        ttl = min(answers.rrset.ttl, MX_CACHE_MAX_TTL) if records else MX_CACHE_NEGATIVE_TTL
+        self._cache_mx_records(domain, now + ttl, records)
         return records
     
-    def _check_smtp(self, email: str, mx_hosts: List[str], timeout: int) -> ValidationResult:
+    def _close_smtp(self, server: smtplib.SMTP) -> None:
+        with self._pool_lock:
+            self._smtp_probes.pop(server, None)
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _acquire_smtp(self, mx: str, timeout: int) -> smtplib.SMTP:
+        with self._pool_lock:
+            pool = self._smtp_pool[mx]
+            slot = self._smtp_slots[mx]
+        # Held until _release_smtp; caps live sessions to this host across workers
+        slot.acquire()
+        try:
+            return self._reuse_or_connect_smtp(mx, pool, timeout)
+        except BaseException:
+            slot.release()
+            raise
+
+    def _reuse_or_connect_smtp(self, mx: str, pool: queue.LifoQueue, timeout: int) -> smtplib.SMTP:
+        while True:
+            try:
+                server = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                # RSET clears the previous transaction and doubles as a liveness check
+                code, _ = server.rset()
+                if code == 250:
+                    return server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._close_smtp(server)
+
+        try:
+            server = _ProbeSMTP(host=mx, port=25, timeout=timeout)
+        except OSError as exc:
+            # SMTPException subclasses OSError; only socket-level failures mean the host is down
+            if not isinstance(exc, smtplib.SMTPException):
+                with self._pool_lock:
+                    self._dead_mx[mx] = time.monotonic()
+            raise
+        try:
+            server.ehlo_or_helo_if_needed()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+            raise
+        return server
+
+    def _release_smtp(self, mx: str, server: smtplib.SMTP, reusable: bool) -> None:
+        with self._pool_lock:
+            probes = self._smtp_probes.get(server, 0) + 1
+            self._smtp_probes[server] = probes
+            pool = self._smtp_pool[mx]
+            slot = self._smtp_slots[mx]
+        try:
+            if not reusable or probes >= SMTP_MAX_PROBES_PER_CONNECTION:
+                self._close_smtp(server)
+                return
+            try:
+                pool.put_nowait(server)
+            except queue.Full:
+                self._close_smtp(server)
+        finally:
+            slot.release()
+
+    def close_smtp_connections(self) -> None:
+        """Close every idle pooled SMTP session."""
+        # Drain the queues in place: sessions still checked out by another run are
+        # released into these same queues and get closed by a later drain
+        with self._pool_lock:
+            pools = list(self._smtp_pool.values())
+        for pool in pools:
+            while True:
+                try:
+                    server = pool.get_nowait()
+                except queue.Empty:
+                    break
+                self._close_smtp(server)
+
+    def _is_mx_dead(self, mx: str) -> bool:
+        with self._pool_lock:
+            failed_at = self._dead_mx.get(mx)
+        return failed_at is not None and time.monotonic() - failed_at < SMTP_DEAD_HOST_TTL
+
+    def _check_smtp(self, email: str, mx_hosts: List[str], timeout: int) -> ResultRow:
         local_email = email
         for mx in mx_hosts:
+            if self._is_mx_dead(mx):
+                continue
+            server = None
+            reusable = False
             try:
-                with smtplib.SMTP(host=mx, port=25, timeout=timeout) as server:
-                    server.ehlo_or_helo_if_needed()
-                    # Use a neutral MAIL FROM, not your real sender
-                    code, _ = server.mail("validator@example.com")
-                    if code < 200 or code >= 300:
-                        continue
-                    code, msg = server.rcpt(local_email)
-                    message = msg.decode(errors="ignore") if isinstance(msg, bytes) else str(msg)
-
-                    if 200 <= code < 300:
-                        return ValidationResult(
-                            email=local_email,
-                            syntax_valid=True,
-                            has_mx_record=True,
-                            smtp_checked=True,
-                            smtp_status="valid",
-                            smtp_code=code,
-                            smtp_message=message,
-                            overall_status="valid",
-                        )
-                    if 500 <= code < 600:
-                        return ValidationResult(
-                            email=local_email,
-                            syntax_valid=True,
-                            has_mx_record=True,
-                            smtp_checked=True,
-                            smtp_status="invalid",
-                            smtp_code=code,
-                            smtp_message=message,
-                            overall_status="invalid_smtp",
-                        )
+                server = self._acquire_smtp(mx, timeout)
+                # Use a neutral MAIL FROM, not your real sender
+                code, _ = server.mail("validator@example.com")
+                reusable = True
+                if code < 200 or code >= 300:
+                    continue
+                code, msg = server.rcpt(local_email)
+                message = msg.decode(errors="ignore") if isinstance(msg, bytes) else str(msg)
+
+                if 200 <= code < 300:
+                    return (local_email, True, True, True, "valid", code, message, "valid")
+                if 500 <= code < 600:
+                    return (local_email, True, True, True, "invalid", code, message, "invalid_smtp")
+                # The host answered RCPT ambiguously; backup MXes would only repeat it
+                break
+            except UnicodeEncodeError:
+                # smtplib only speaks ASCII (no SMTPUTF8), so no MX can be asked about this address.
+                # The session is left mid-transaction, so don't hand it back to the pool
+                reusable = False
+                return (local_email, True, True, True, "unknown", None, "Address cannot be encoded for SMTP", "unknown")
             except (smtplib.SMTPConnectError, smtplib.SMTPServerDisconnected, smtplib.SMTPHeloError, smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError, socket.timeout, OSError) as exc:
+                reusable = False
                 last_error = str(exc)
                 continue
+            finally:
+                if server is not None:
+                    self._release_smtp(mx, server, reusable)
 
-        return ValidationResult(
-            email=local_email,
-            syntax_valid=True,
-            has_mx_record=True,
-            smtp_checked=True,
-            smtp_status="unknown",
-            smtp_code=None,
-            smtp_message="All MX hosts failed or returned ambiguous responses",
-            overall_status="unknown",
-        )
+        return (local_email, True, True, True, "unknown", None, "All MX hosts failed or returned ambiguous responses", "unknown")
         
+    def _is_catch_all(self, domain: str, mx_hosts: List[str], timeout: int) -> bool:
+        while True:
+            now = time.monotonic()
+            with self._catchall_lock:
+                cached = self._catchall_cache.get(domain)
+                if cached is not None and cached[0] > now:
+                    return cached[1]
+                inflight = self._catchall_inflight.get(domain)
+                if inflight is None:
+                    inflight = self._catchall_inflight[domain] = threading.Event()
+                    break
+            # Another thread is probing this domain: wait for it, then re-read the cache
+            inflight.wait()
+
+        try:
+            catch_all, ttl = self._probe_catch_all(domain, mx_hosts, timeout)
+            with self._catchall_lock:
+                self._catchall_cache[domain] = (time.monotonic() + ttl, catch_all)
+        finally:
+            with self._catchall_lock:
+                del self._catchall_inflight[domain]
+            inflight.set()
+        return catch_all
+
+    def _probe_catch_all(self, domain: str, mx_hosts: List[str], timeout: int) -> Tuple[bool, float]:
+        """Probe once with a random address; returns (catch_all, how long to trust the answer)."""
+        # A random 20-char local part should never exist; if it's accepted, RCPT tells us nothing
+        probe = self._check_smtp(f"{secrets.token_hex(10)}@{domain}", mx_hosts, timeout=timeout)
+        probe_status = probe[FIELDNAMES.index("smtp_status")]
+        if probe_status == "unknown":
+            # Inconclusive (4xx, greylisting): treat as not catch-all, but remember that
+            # briefly so the domain's other addresses don't each repeat the probe
+            return False, CATCHALL_INCONCLUSIVE_TTL
+        return probe_status == "valid", CATCHALL_CACHE_TTL
+
     def _validate_email_address(self, email: str, enable_smtp: bool, timeout: int) -> ValidationResult:
         clean_email = email.strip().lower()
         if not clean_email:
@@ -114,7 +422,8 @@ class EmailVerifier:
                 overall_status="invalid_syntax",
             )
 
-        if not self._is_valid_syntax(clean_email):
+        match = EMAIL_REGEX.match(clean_email)
+        if match is None:
             return ValidationResult(
                 email=clean_email,
                 syntax_valid=False,
@@ -126,82 +435,142 @@ class EmailVerifier:
                 overall_status="invalid_syntax",
             )
 
-        domain = clean_email.split("@", 1)[1]
-        mx_records = self._lookup_mx_records(domain, timeout=timeout)
+        return ValidationResult(*self._validate_parsed_email(clean_email, match.group("domain"), enable_smtp, timeout))
+
+    def _validate_parsed_email(
+        self,
+        clean_email: str,
+        domain: str,
+        enable_smtp: bool,
+        timeout: int,
+        mx_records: Optional[List[str]] = None,
+    ) -> ResultRow:
+        """DNS and SMTP stages for an address that is already cleaned and syntax-checked.
+
+        Bulk callers pass the MX hosts they resolved up front, so no lookup repeats here.
+        Returns a bare ResultRow so the bulk path never builds a ValidationResult.
+        """
+        if mx_records is None:
+            mx_records = self._lookup_mx_records(domain, timeout=timeout)
         if not mx_records:
-            return ValidationResult(
-                email=clean_email,
-                syntax_valid=True,
-                has_mx_record=False,
-                smtp_checked=False,
-                smtp_status="unknown",
-                smtp_code=None,
-                smtp_message="No MX records found",
-                overall_status="no_mx",
-            )
+            return (clean_email, True, False, False, "unknown", None, "No MX records found", "no_mx")
 
         if not enable_smtp:
-            return ValidationResult(
-                email=clean_email,
-                syntax_valid=True,
-                has_mx_record=True,
-                smtp_checked=False,
-                smtp_status="skipped",
-                smtp_code=None,
-                smtp_message="SMTP check disabled",
-                overall_status="valid_dns_only",
-            )
+            return (clean_email, True, True, False, "skipped", None, "SMTP check disabled", "valid_dns_only")
+
+        if self._is_catch_all(domain, mx_records, timeout=timeout):
+            return (clean_email, True, True, True, "catch_all", None, "Domain accepts any recipient", "catch_all")
 
         return self._check_smtp(clean_email, mx_records, timeout=timeout)
     
-    def _load_emails_from_csv(self, path: str) -> List[str]:
-        emails: List[str] = []
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            # Be tolerant: if header names are odd, just use the first column as email
-            if not reader.fieldnames:
-                raise ValueError("CSV appears to have no header row or columns")
-            email_key = reader.fieldnames[0]
-            for row in reader:
-                value = (row.get(email_key) or "").strip()
-                if value:
-                    emails.append(value)
-        # Deduplicate while preserving order
-        seen = set()
-        unique: List[str] = []
-        for e in emails:
-            if e not in seen:
-                seen.add(e)
-                unique.append(e)
-        return unique
+    def _load_emails_from_csv(self, path: Union[str, IO[bytes]]) -> List[str]:
+        # Be tolerant: if header names are odd, just use the first column as email.
+        # An empty file raises pandas' EmptyDataError, a ValueError like before.
+        unique: Dict[str, None] = {}
+        for chunk in pd.read_csv(
+            path,
+            usecols=[0],
+            dtype=str,
+            keep_default_na=False,
+            encoding="utf-8",
+            chunksize=CSV_CHUNK_SIZE,
+        ):
+            emails = chunk.iloc[:, 0].str.strip()
+            # Deduplicate while preserving order, across chunks as well
+            unique.update(dict.fromkeys(emails[emails.ne("")].drop_duplicates()))
+        return list(unique)
     
     def _write_results_to_csv(self, path: str, results: List[ValidationResult]) -> None:
-        fieldnames = [
-            "email",
-            "syntax_valid",
-            "has_mx_record",
-            "smtp_checked",
-            "smtp_status",
-            "smtp_code",
-            "smtp_message",
-            "overall_status",
-        ]
+        # Same row path as the bulk stream: no DataFrame, no per-row dict
         with open(path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for r in results:
-                writer.writerow(
-                    {
-                        "email": r.email,
-                        "syntax_valid": r.syntax_valid,
-                        "has_mx_record": r.has_mx_record,
-                        "smtp_checked": r.smtp_checked,
-                        "smtp_status": r.smtp_status,
-                        "smtp_code": r.smtp_code if r.smtp_code is not None else "",
-                        "smtp_message": r.smtp_message,
-                        "overall_status": r.overall_status,
-                    }
-                )
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            # csv.writer renders a missing smtp_code (None) as an empty cell
+            writer.writerows(_result_row(r) for r in results)
+
+    def _group_emails_by_mx(
+        self,
+        emails: List[str],
+        domains: List[str],
+        timeout: int,
+    ) -> Tuple[Dict[str, List[BulkItem]], List[str]]:
+        """Bucket emails with their domain and MX hosts by primary MX; emails without MX are returned separately."""
+        unique_domains = set(domains)
+        # Resolve every domain up front on a wide pool of its own, so slow DNS never
+        # queues behind SMTP work. Workers reuse these answers rather than looking up again,
+        # so a domain that failed here (even transiently) is never retried per address
+        domain_to_mx: Dict[str, List[str]] = {}
+        if unique_domains:
+            with ThreadPoolExecutor(max_workers=min(DNS_MAX_WORKERS, len(unique_domains))) as dns_executor:
+                domain_to_mx = dict(zip(
+                    unique_domains,
+                    dns_executor.map(lambda domain: self._lookup_mx_records(domain, timeout), unique_domains),
+                ))
+
+        mx_to_emails: Dict[str, List[BulkItem]] = defaultdict(list)
+        no_mx: List[str] = []
+        for email, domain in zip(emails, domains):
+            mx_records = domain_to_mx[domain]
+            if mx_records:
+                mx_to_emails[mx_records[0]].append((email, domain, mx_records))
+            else:
+                no_mx.append(email)
+        return mx_to_emails, no_mx
+
+    def _validate_email_batch(
+        self,
+        emails: List[BulkItem],
+        enable_smtp: bool,
+        timeout: int,
+        progress: _ProgressCounter,
+        cancel_event: threading.Event,
+    ) -> List[ResultRow]:
+        rows: List[ResultRow] = []
+        # Addresses arrive cleaned, syntax-checked and resolved by the earlier phases
+        for clean_email, domain, mx_records in emails:
+            if cancel_event.is_set():
+                break
+            rows.append(self._validate_parsed_email(clean_email, domain, enable_smtp, timeout, mx_records))
+            progress.add()
+        return rows
+
+    def _iter_result_batches(
+        self,
+        prefilled_rows: List[ResultRow],
+        mx_to_emails: Dict[str, List[BulkItem]],
+        enable_smtp: bool,
+        max_workers: int,
+        timeout: int,
+        progress: _ProgressCounter,
+        cancel_event: threading.Event,
+    ) -> Iterator[List[ResultRow]]:
+        """Yield completed result rows at least every PROGRESS_INTERVAL seconds, possibly none."""
+        if prefilled_rows:
+            yield prefilled_rows
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Up to SMTP_MAX_SESSIONS_PER_HOST tasks per MX host, each reusing one pooled
+                # SMTP session, so a dominant provider still gets parallel workers
+                future_to_emails = {
+                    executor.submit(self._validate_email_batch, sub_batch, enable_smtp, timeout, progress, cancel_event): sub_batch
+                    for bucket in mx_to_emails.values()
+                    for sub_batch in _split_evenly(bucket, SMTP_MAX_SESSIONS_PER_HOST)
+                }
+                pending = set(future_to_emails)
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+                        yield [row for future in done for row in future.result()]
+                except BaseException:
+                    # A failed worker or a cancelled consumer: stop the other workers and drop
+                    # queued batches now, or leaving the executor would wait for all of them
+                    cancel_event.set()
+                    for future in pending:
+                        future.cancel()
+                    raise
+        finally:
+            self.close_smtp_connections()
+
     def stream_summary(self, summary: dict):
         yield "Summary by overall_status:\n"
         for status, count in summary.items():
@@ -209,45 +578,89 @@ class EmailVerifier:
                 
     def process_emails_in_bulk(
         self,
-        input_path: str,
+        input_path: Union[str, IO[bytes]],
         output_path: str,
         enable_smtp: bool=True,
         max_workers: int=10,
         timeout: int=10,
+        progress_cb: Optional[Callable[[int, int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
     ) -> Tuple[pd.DataFrame, Dict]:
-        
+        """
+        Validate every email in the input CSV, streaming results to output_path.
+
+        progress_cb is called from this thread as (validated, total). Setting
+        cancel_event stops the workers; rows finished so far are still written.
+        """
+        if cancel_event is None:
+            cancel_event = threading.Event()
+        # Once per run keeps the long-lived caches bounded by what recent runs touched
+        self._prune_expired_caches()
+
         emails = self._load_emails_from_csv(input_path)
         total = len(emails)
         
-        print(f"Loaded {total} unique emails from {input_path}")
-
-        results: List[ValidationResult] = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_email = {
-                executor.submit(self._validate_email_address, email, enable_smtp, timeout): email
-                for email in emails
-            }
-            completed = 0
-            # try:
-            for future in as_completed(future_to_email):
-                result = future.result()
-                results.append(result)
-        
-        df_results = pd.DataFrame([r.__dict__ for r in results])
-                    
-                    
-        #     #         completed += 1
-        #     #         if completed % 50 == 0 or completed == total:
-        #     #             print(f"Processed {completed}/{total} emails")
-        #     # except KeyboardInterrupt:
-        #     #     print("Interrupted by user, writing partial results...")
-
-        # self._write_results_to_csv(output_path, results)
-        # print(f"Wrote {len(results)} results to {output_path}")
-
-        summary = {}
-        for r in results:
-            summary[r.overall_status] = summary.get(r.overall_status, 0) + 1
-            
-        return df_results, summary
+        print(f"Loaded {total} unique emails from {getattr(input_path, 'name', input_path)}")
+
+        # Syntax check and domain extraction run vectorized; only valid rows reach the thread pool
+        email_series = pd.Series(emails, dtype=object)
+        clean_emails = email_series.str.strip().str.lower()
+        # pandas compiles with the stdlib engine, so hand it the pattern string
+        domains = clean_emails.str.extract(EMAIL_REGEX.pattern)["domain"]
+        syntax_mask = domains.notna()
+
+        invalid_rows: List[ResultRow] = [
+            (clean_email, False, False, False, "invalid", None, "Invalid syntax", "invalid_syntax")
+            for clean_email in clean_emails[~syntax_mask]
+        ]
+        valid_emails = clean_emails[syntax_mask].tolist()
+        valid_domains = domains[syntax_mask].tolist()
+
+        mx_to_emails, no_mx = self._group_emails_by_mx(valid_emails, valid_domains, timeout)
+        # Known without any worker: bad syntax, or no MX found in the resolution phase
+        prefilled_rows = invalid_rows + [
+            (clean_email, True, False, False, "unknown", None, "No MX records found", "no_mx")
+            for clean_email in no_mx
+        ]
+
+        # Rows go to disk as they complete; only a bounded tail is kept for the UI preview
+        preview: Deque[ResultRow] = deque(maxlen=PREVIEW_ROWS)
+        summary: Dict[str, int] = {}
+        written = 0
+        progress = _ProgressCounter(initial=len(prefilled_rows))
+        with open(output_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDNAMES)
+            batches = self._iter_result_batches(
+                prefilled_rows, mx_to_emails, enable_smtp, max_workers, timeout, progress, cancel_event
+            )
+            try:
+                for batch in batches:
+                    # csv.writer renders a missing smtp_code (None) as an empty cell
+                    writer.writerows(batch)
+                    preview.extend(batch)
+                    for row in batch:
+                        overall_status = row[-1]
+                        summary[overall_status] = summary.get(overall_status, 0) + 1
+                    flushed_at = written // CSV_FLUSH_EVERY
+                    written += len(batch)
+                    if written // CSV_FLUSH_EVERY > flushed_at:
+                        f.flush()
+                    if progress_cb:
+                        progress_cb(progress.value, total)
+            except BaseException:
+                # Interrupted (e.g. by a Streamlit rerun): stop the workers before unwinding
+                cancel_event.set()
+                raise
+            finally:
+                batches.close()
+
+        if cancel_event.is_set():
+            print(f"Cancelled: wrote {written}/{total} results to {output_path}")
+        else:
+            print(f"Wrote {written} results to {output_path}")
+
+        df_preview = pd.DataFrame.from_records(list(preview), columns=FIELDNAMES)
+        df_preview["smtp_code"] = df_preview["smtp_code"].astype("Int64")
+        return df_preview, summary
         
\ No newline at end of file
@@ -1,5 +1,9 @@
 import streamlit as st
-import os
+import tempfile
+
+# Resolved once at import rather than on every session initialization. Results files
+# go to the system temp dir so ones left by ended sessions don't pile up in the app dir
+_DEFAULT_OUTPUT_DIR = tempfile.gettempdir()
 
 class SessionManager:
     def __init__(self):
@@ -11,7 +15,7 @@ class SessionManager:
                 st.session_state.ev_upload_csv_file = None
                 
             if "ev_output_csv_filepath" not in st.session_state:
-                st.session_state.ev_output_csv_filepath = os.getcwd()
+                st.session_state.ev_output_csv_filepath = _DEFAULT_OUTPUT_DIR
                 
             if "results_df" not in st.session_state:
                 st.session_state.results_df = None